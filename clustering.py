@@ -0,0 +1,185 @@
+"""MinHash / LSH clustering of feedback text.
+
+Each entry gets MinHash signatures when it is submitted. Signatures are
+banded into LSH indexes so a new entry only has to be compared against the
+entries that share a bucket with it, never against the whole dataset.
+
+Two levels are kept side by side: ``cluster_id`` groups near-duplicates
+(word unigrams and bigrams, strict threshold) and ``theme_id`` groups
+entries about the same topic (stemmed unigrams only, looser threshold).
+"""
+import hashlib
+import random
+import re
+from collections import defaultdict
+
+# ── Parameters ───────────────────────────────────────────────────────────────
+NUM_PERM = 64          # signature length
+DUPLICATE_BANDS = 16   # LSH bands per level; NUM_PERM must divide evenly
+THEME_BANDS = 32
+DUPLICATE_THRESHOLD = 0.5  # estimated Jaccard needed to join a duplicate cluster
+THEME_THRESHOLD = 0.35     # estimated Jaccard needed to join a theme
+SEED = 1               # fixed so stored signatures stay comparable across runs
+SIGNATURE_KEYS = ("minhash", "theme_minhash")
+
+_PRIME = (1 << 61) - 1
+_SLOT_BITS = 8         # b-bit MinHash: keep the low 8 bits of each minimum
+_rng = random.Random(SEED)
+_PERMS = [(_rng.randint(1, _PRIME - 1), _rng.randint(0, _PRIME - 1)) for _ in range(NUM_PERM)]
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "i", "in", "is",
+    "it", "its", "me", "my", "of", "on", "or", "so", "that", "the", "this", "to",
+    "was", "we", "with", "you", "your",
+}
+_THEME_STOPWORDS = _STOPWORDS | {
+    "again", "all", "always", "every", "just", "keep", "keeps", "much", "really",
+    "still", "time", "times", "too", "very", "when", "whenever",
+}
+
+
+# ── Signatures ───────────────────────────────────────────────────────────────
+def _words(text, stopwords):
+    return [w for w in re.findall(r"[a-z0-9']+", text.lower()) if w not in stopwords]
+
+
+def _stem(word):
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def duplicate_shingles(text):
+    words = _words(text, _STOPWORDS)
+    if len(words) < 2:
+        return set(words)
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def theme_shingles(text):
+    return {_stem(w) for w in _words(text, _THEME_STOPWORDS)}
+
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(shingles):
+    """Signature as a hex string (2 hex digits per slot); empty text gives ""."""
+    hashes = [_hash(s) for s in shingles]
+    if not hashes:
+        return ""
+    mask = (1 << _SLOT_BITS) - 1
+    return "".join(f"{min((a * h + b) % _PRIME for h in hashes) & mask:02x}" for a, b in _PERMS)
+
+
+def decode(sig):
+    return [int(sig[i:i + 2], 16) for i in range(0, len(sig), 2)]
+
+
+def similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def sign(entry):
+    text = entry.get("feedback", "")
+    entry["minhash"] = minhash(duplicate_shingles(text))
+    entry["theme_minhash"] = minhash(theme_shingles(text))
+    return entry
+
+
+# ── LSH Index ────────────────────────────────────────────────────────────────
+class LSHIndex:
+    def __init__(self, bands, threshold):
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.threshold = threshold
+        self.buckets = defaultdict(set)
+        self.signatures = {}
+        self.clusters = {}
+
+    def _bands(self, sig):
+        for i in range(self.bands):
+            yield i, tuple(sig[i * self.rows:(i + 1) * self.rows])
+
+    def candidates(self, sig):
+        found = set()
+        for band in self._bands(sig):
+            found |= self.buckets.get(band, set())
+        return found
+
+    def add(self, entry_id, sig, cluster_id):
+        self.clusters[entry_id] = cluster_id
+        if sig:
+            self.signatures[entry_id] = sig
+            for band in self._bands(sig):
+                self.buckets[band].add(entry_id)
+
+    def assign(self, entry_id, sig):
+        """Return the cluster of the most similar indexed entry, or a new one."""
+        best, best_sim = None, self.threshold
+        for other in self.candidates(sig) if sig else ():
+            sim = similarity(sig, self.signatures[other])
+            if sim >= best_sim:
+                best, best_sim = other, sim
+        return self.clusters[best] if best is not None else entry_id
+
+
+class ClusterIndex:
+    def __init__(self):
+        self.levels = {
+            "cluster_id": ("minhash", LSHIndex(DUPLICATE_BANDS, DUPLICATE_THRESHOLD)),
+            "theme_id": ("theme_minhash", LSHIndex(THEME_BANDS, THEME_THRESHOLD)),
+        }
+
+    def add(self, entry):
+        """Index a signed entry, assigning any cluster ids it does not have yet.
+
+        Returns True when ids were assigned, so the caller knows to persist them.
+        """
+        changed = False
+        for key, (sig_key, index) in self.levels.items():
+            sig = decode(entry[sig_key])
+            if key not in entry:
+                entry[key] = index.assign(entry["id"], sig)
+                changed = True
+            index.add(entry["id"], sig, entry[key])
+        return changed
+
+
+def build_index(data):
+    """Index every entry in ``data``.
+
+    Entries from before clustering existed (or with signatures in an older
+    format) are signed and clustered here, in submission order, and the
+    function reports whether ``data`` changed so the caller can persist it.
+    """
+    index = ClusterIndex()
+    changed = False
+    for entry in sorted(data, key=lambda d: d["timestamp"]):
+        if not isinstance(entry.get("minhash"), str) or "theme_minhash" not in entry:
+            sign(entry)
+            for key in index.levels:
+                entry.pop(key, None)
+        changed |= index.add(entry)
+    return index, changed
+
+
+def cluster_entry(entry, index):
+    """Sign a new entry and attach it to existing clusters where possible."""
+    index.add(sign(entry))
+    return entry
+
+
+def group_clusters(entries, key="cluster_id"):
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[entry.get(key, entry["id"])].append(entry)
+    return groups
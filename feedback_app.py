@@ -1,12 +1,17 @@
 import streamlit as st
 import pandas as pd
+import html
 import json
 import os
+import threading
 from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
 
+import outbox
+from clustering import SIGNATURE_KEYS, build_index, cluster_entry, group_clusters
+
 # ── Page Config ─────────────────────────────────────────────────────────────
 st.set_page_config(
     page_title="Pulse · Feedback System",
@@ -302,7 +307,7 @@ hr {
 """, unsafe_allow_html=True)
 
 # ── Data Storage ─────────────────────────────────────────────────────────────
-DATA_FILE = "feedback_data.json"
+DATA_FILE = os.environ.get("PULSE_DATA_FILE", "feedback_data.json")
 
 def load_data():
     if os.path.exists(DATA_FILE):
@@ -314,6 +319,31 @@ def save_data(data):
     with open(DATA_FILE, "w") as f:
         json.dump(data, f, indent=2)
 
+def _data_mtime():
+    return os.stat(DATA_FILE).st_mtime_ns if os.path.exists(DATA_FILE) else None
+
+@st.cache_resource
+def _cluster_cache():
+    return {"lock": threading.Lock(), "mtime": None, "index": None}
+
+def cluster_index(data):
+    """LSH index for ``data``, rebuilt only when the data file changed on disk."""
+    cache = _cluster_cache()
+    if cache["index"] is None or cache["mtime"] != _data_mtime():
+        index, backfilled = build_index(data)
+        if backfilled:
+            save_data(data)
+        cache.update(index=index, mtime=_data_mtime())
+    return cache["index"]
+
+def save_indexed(data):
+    """Save a change the cached cluster index already reflects, keeping it valid."""
+    cache = _cluster_cache()
+    fresh = cache["mtime"] == _data_mtime()
+    save_data(data)
+    if fresh:
+        cache["mtime"] = _data_mtime()
+
 def get_sentiment(rating):
     if rating >= 4: return "positive"
     if rating == 3: return "neutral"
@@ -322,6 +352,26 @@ def get_sentiment(rating):
 def get_stars(rating):
     return "★" * rating + "☆" * (5 - rating)
 
+def reply_to(ids, text):
+    """Apply a reply to the current file contents, so concurrent submits survive."""
+    ids = set(ids)
+    now = datetime.now().isoformat()
+    with _cluster_cache()["lock"]:
+        data = load_data()
+        for d in data:
+            if d["id"] in ids:
+                d["responded"] = True
+                d["response"] = text
+                d["response_time"] = now
+        save_indexed(data)
+    outbox.enqueue([d for d in data if d["id"] in ids], text)
+
+@st.cache_resource
+def start_delivery_workers():
+    return outbox.DeliveryWorkers().start()
+
+start_delivery_workers()
+
 # ── Sidebar ───────────────────────────────────────────────────────────────────
 with st.sidebar:
     st.markdown("""
@@ -443,9 +493,10 @@ if page == "Submit Feedback":
                 "responded": False,
                 "response": "",
             }
-            data = load_data()
-            data.append(entry)
-            save_data(data)
+            with _cluster_cache()["lock"]:
+                data = load_data()
+                data.append(cluster_entry(entry, cluster_index(data)))
+                save_indexed(data)
             st.success(f"✓ Thank you, {name}! Your feedback has been recorded.")
             st.balloons()
 
@@ -595,14 +646,19 @@ elif page == "Response Manager":
         st.info("No feedback yet.")
         st.stop()
 
+    with _cluster_cache()["lock"]:
+        cluster_index(data)
+
     # Filters
-    f1, f2, f3 = st.columns(3)
+    f1, f2, f3, f4 = st.columns(4)
     with f1:
         filter_sent = st.selectbox("Sentiment", ["All", "Positive", "Neutral", "Negative"])
     with f2:
         filter_status = st.selectbox("Status", ["All", "Pending", "Responded"])
     with f3:
         filter_cat = st.selectbox("Category", ["All"] + list({d["category"] for d in data}))
+    with f4:
+        view = st.selectbox("View", ["Entries", "Duplicates", "Themes"])
 
     filtered = data[:]
     if filter_sent != "All":
@@ -615,9 +671,10 @@ elif page == "Response Manager":
         filtered = [d for d in filtered if d["category"] == filter_cat]
 
     filtered.sort(key=lambda x: x["timestamp"], reverse=True)
+    deliveries = outbox.delivery_status()
     st.markdown(f"<div style='font-family:\"DM Mono\",monospace; font-size:0.75rem; color:#6b7280; margin-bottom:1rem; letter-spacing:0.08em;'>SHOWING {len(filtered)} RESULT(S)</div>", unsafe_allow_html=True)
 
-    for entry in filtered:
+    def render_entry(entry):
         sent = entry.get("sentiment", "neutral")
         pill_cls = "tag-pill" if sent == "positive" else ("tag-pill-neg" if sent == "negative" else "tag-pill-neu")
         stars_html = f"<span class='fc-stars' style='color:{'#f5c842' if sent=='positive' else ('#ff6b6b' if sent=='negative' else '#4ecdc4')};'>{get_stars(entry['rating'])}</span>"
@@ -631,6 +688,20 @@ elif page == "Response Manager":
             "color:#ff6b6b;font-family:DM Mono,monospace;font-size:0.65rem;padding:2px 8px;border-radius:20px;"
             "letter-spacing:0.06em;text-transform:uppercase;'>Pending</span>"
         )
+        delivery = deliveries.get(entry["id"])
+        delivery_badge = ""
+        if delivery:
+            d_color = {"sent": "#a8e6cf", "failed": "#ff6b6b", "retrying": "#ffa07a"}.get(delivery["status"], "#4ecdc4")
+            d_label = {
+                "sent": "✉ Delivered",
+                "failed": "✉ Failed",
+                "retrying": f"✉ Retrying · {delivery['attempts']}",
+            }.get(delivery["status"], "✉ Queued")
+            delivery_badge = (
+                f"<span title='{html.escape(delivery['last_error'])}' style='border:1px solid {d_color};color:{d_color};"
+                "font-family:DM Mono,monospace;font-size:0.65rem;padding:2px 8px;border-radius:20px;"
+                f"letter-spacing:0.06em;text-transform:uppercase;'>{d_label}</span>"
+            )
 
         st.markdown(f"""
         <div class='feedback-card'>
@@ -638,7 +709,7 @@ elif page == "Response Manager":
                 {stars_html} &nbsp;·&nbsp; {entry['name']} &nbsp;·&nbsp;
                 {entry['category']} &nbsp;·&nbsp;
                 {entry['timestamp'][:10]} &nbsp;·&nbsp; NPS: {entry.get('nps','—')}
-                &nbsp;&nbsp;{responded_badge}
+                &nbsp;&nbsp;{responded_badge} {delivery_badge}
             </div>
             <div class='fc-text'>"{entry['feedback']}"</div>
             {'<div style="margin-top:0.5rem;">' + tags_html + '</div>' if tags_html else ''}
@@ -654,13 +725,8 @@ elif page == "Response Manager":
                 )
                 if st.button("Send Reply", key=f"btn_{entry['id']}"):
                     if resp_text:
-                        for i, d in enumerate(data):
-                            if d["id"] == entry["id"]:
-                                data[i]["responded"] = True
-                                data[i]["response"] = resp_text
-                                data[i]["response_time"] = datetime.now().isoformat()
-                        save_data(data)
-                        st.success("Reply saved!")
+                        reply_to([entry["id"]], resp_text)
+                        st.success("Reply saved — delivery queued!")
                         st.rerun()
         else:
             with st.expander("↳ View your reply"):
@@ -670,6 +736,41 @@ elif page == "Response Manager":
                     unsafe_allow_html=True,
                 )
 
+    if view == "Entries":
+        for entry in filtered:
+            render_entry(entry)
+    else:
+        level = "cluster_id" if view == "Duplicates" else "theme_id"
+        noun = "Cluster" if view == "Duplicates" else "Theme"
+        groups = sorted(group_clusters(filtered, level).items(), key=lambda g: len(g[1]), reverse=True)
+        for cluster_id, members in groups:
+            if len(members) == 1:
+                render_entry(members[0])
+                continue
+            everyone = [d for d in data if d.get(level) == cluster_id]
+            pending_ids = [d["id"] for d in everyone if not d.get("responded")]
+            lead = min(everyone, key=lambda d: d["timestamp"])
+            st.markdown(f"""
+            <div class='hero-banner' style='padding:1rem 1.4rem; margin-bottom:0.8rem;'>
+                <div class='hero-label'>✦ {noun} · {len(everyone)} similar entries · {len(pending_ids)} pending</div>
+                <div class='fc-text'>"{lead['feedback']}"</div>
+            </div>
+            """, unsafe_allow_html=True)
+            if pending_ids:
+                with st.expander(f"↳ Reply to all {len(pending_ids)} pending in this {noun.lower()}"):
+                    bulk_text = st.text_area(
+                        "Your response", key=f"cresp_{level}_{cluster_id}",
+                        placeholder=f"One reply for everyone in this {noun.lower()}...",
+                        height=100,
+                    )
+                    if st.button(f"Send to {noun}", key=f"cbtn_{level}_{cluster_id}"):
+                        if bulk_text:
+                            reply_to(pending_ids, bulk_text)
+                            st.success(f"Reply saved for {len(pending_ids)} entries — delivery queued!")
+                            st.rerun()
+            for entry in members:
+                render_entry(entry)
+
 # ── Page: Settings ────────────────────────────────────────────────────────────
 elif page == "Settings":
     st.markdown("<h1>Settings</h1>", unsafe_allow_html=True)
@@ -680,7 +781,7 @@ elif page == "Settings":
 
     with st.expander("▾ Export Data"):
         if data:
-            df_export = pd.DataFrame(data)
+            df_export = pd.DataFrame(data).drop(columns=list(SIGNATURE_KEYS), errors="ignore")
             csv = df_export.to_csv(index=False).encode("utf-8")
             st.download_button(
                 "⬇ Download CSV",
@@ -689,7 +790,7 @@ elif page == "Settings":
                 "text/csv",
                 use_container_width=False,
             )
-            json_str = json.dumps(data, indent=2)
+            json_str = json.dumps([{k: v for k, v in d.items() if k not in SIGNATURE_KEYS} for d in data], indent=2)
             st.download_button(
                 "⬇ Download JSON",
                 json_str,
@@ -700,11 +801,12 @@ elif page == "Settings":
             st.info("No data to export yet.")
 
     with st.expander("▾ Danger Zone"):
-        st.warning("⚠ This will permanently delete all feedback data.")
+        st.warning("⚠ This will permanently delete all feedback data and cancel undelivered replies.")
         confirm = st.checkbox("I understand this action is irreversible")
         if confirm:
             if st.button("🗑 Clear All Feedback", type="primary"):
                 save_data([])
+                outbox.clear()
                 st.success("All feedback has been cleared.")
                 st.rerun()
 
@@ -718,6 +820,8 @@ elif page == "Settings":
         ✦ Real-time analytics dashboard<br>
         ✦ Sentiment auto-detection<br>
         ✦ Response manager with reply threading<br>
+        ✦ Duplicate & theme clustering with bulk replies<br>
+        ✦ Background email delivery of replies<br>
         ✦ CSV / JSON export<br>
         ✦ Persistent local storage<br>
         </div>
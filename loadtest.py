@@ -0,0 +1,321 @@
+"""Concurrent-session load test for the Pulse Streamlit app.
+
+Runs many headless sessions of ``feedback_app.py`` in parallel through
+Streamlit's app-testing API against a seeded dataset in a scratch directory.
+Each session performs a weighted mix of submits, dashboard views, filtered
+Response Manager browsing and replies.
+
+Topology: every session is its own process. ``AppTest`` creates and tears
+down a process-global Streamlit runtime on each run, so sessions cannot share
+one process. A deployed Pulse is a single ``streamlit run`` server whose
+sessions are threads sharing ``st.cache_resource`` (the cluster index and its
+lock) and the outbox lock; here each process has its own copies, so writes
+from different sessions are not serialized. The harness therefore models
+several independent servers on one data file. That is a harsher case than
+production: its lost-write and corruption figures are an upper bound, while
+its render latencies are representative of a single session.
+
+    python loadtest.py --sessions 8 --actions 25 --mix submit=4,dashboard=2,browse=3,reply=1
+
+Latency is the time of the script run that performs the action (the submit
+or reply click, the dashboard render, the filtered render); navigating to the
+page first is setup and is not timed. The report lists throughput, latency
+percentiles per action and lost writes: submissions or replies the app
+acknowledged whose text is missing from the data file once every session has
+finished. If the data file stops parsing for good, every session stops and
+the report says so instead of piling up failures against a broken file.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+APP_FILE = str(Path(__file__).resolve().parent / "feedback_app.py")
+ACTIONS = ["submit", "dashboard", "browse", "reply"]
+DEFAULT_MIX = "submit=4,dashboard=2,browse=3,reply=1"
+
+CATEGORIES = ["Product", "Customer Support", "Onboarding", "Performance", "Feature Request", "Other"]
+SOURCES = ["Organic", "Referral", "Social Media", "Ad", "Event"]
+TEXTS = [
+    "The app crashes every time I upload a photo",
+    "Checkout page is really slow on mobile",
+    "Love the new dashboard design, very clean",
+    "Support took three days to answer my ticket",
+    "Please add a dark mode to the export screen",
+    "Pricing is too high for small teams",
+]
+
+
+# ── Seeding ──────────────────────────────────────────────────────────────────
+def seed_dataset(path, count, rng):
+    from clustering import build_index
+
+    start = datetime.now() - timedelta(days=30)
+    data = []
+    for i in range(count):
+        ts = start + timedelta(minutes=rng.randint(0, 30 * 24 * 60))
+        rating = rng.randint(1, 5)
+        data.append({
+            "id": f"{ts.strftime('%Y%m%d%H%M%S')}{i:06d}",
+            "timestamp": ts.isoformat(),
+            "name": f"Seed User {i}",
+            "email": f"seed{i}@example.com",
+            "category": rng.choice(CATEGORIES),
+            "source": rng.choice(SOURCES),
+            "rating": rating,
+            "feedback": f"{rng.choice(TEXTS)} ({rng.randint(1, 99)})",
+            "tags": [],
+            "nps": rng.randint(0, 10),
+            "sentiment": "positive" if rating >= 4 else ("neutral" if rating == 3 else "negative"),
+            "responded": rng.random() < 0.3,
+            "response": "",
+        })
+    build_index(data)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+# ── Session ──────────────────────────────────────────────────────────────────
+def _goto(at, page):
+    if at.sidebar.radio[0].value != page:
+        at.sidebar.radio[0].set_value(page).run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+def _selectbox(at, label):
+    return next(s for s in at.selectbox if s.label == label)
+
+def _timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    return time.perf_counter() - start
+
+# Each handler returns (acknowledged write or None, seconds of the timed run).
+def do_submit(at, rng, marker):
+    _goto(at, "Submit Feedback")
+    at.text_input[0].input(f"Load {marker}")
+    at.text_input[1].input(f"{marker}@example.com")
+    at.text_area[0].input(f"{rng.choice(TEXTS)} [{marker}]")
+    next(b for b in at.button if b.label.startswith("Submit Feedback")).click()
+    seconds = _timed_run(at)
+    acked = any("Thank you" in s.value for s in at.success)
+    return (marker if acked else None), seconds
+
+def do_dashboard(at, rng, marker):
+    _goto(at, "Dashboard")
+    return None, _timed_run(at)
+
+def do_browse(at, rng, marker):
+    _goto(at, "Response Manager")
+    for label in ("Sentiment", "Status", "Category", "View"):
+        box = _selectbox(at, label)
+        box.set_value(rng.choice(box.options))
+    return None, _timed_run(at)
+
+def do_reply(at, rng, marker):
+    _goto(at, "Response Manager")
+    _selectbox(at, "Status").set_value("Pending")
+    _selectbox(at, "View").set_value("Entries")
+    at.run()
+    boxes = [t for t in at.text_area if t.key and t.key.startswith("resp_")]
+    if not boxes:
+        return None, None
+    entry_id = rng.choice(boxes).key[len("resp_"):]
+    at.text_area(key=f"resp_{entry_id}").input(f"Thanks for the report [{marker}]")
+    at.button(key=f"btn_{entry_id}").click()
+    seconds = _timed_run(at)
+    # The app reruns after saving; a handled reply drops out of the Pending list.
+    acked = not any(t.key == f"resp_{entry_id}" for t in at.text_area)
+    return ((entry_id, marker) if acked else None), seconds
+
+HANDLERS = {"submit": do_submit, "dashboard": do_dashboard, "browse": do_browse, "reply": do_reply}
+
+
+def data_file_readable(path, attempts=3, delay=0.2):
+    """False only if ``path`` stays unparseable; a save in progress is retried."""
+    for _ in range(attempts):
+        try:
+            with open(path) as f:
+                json.load(f)
+            return True
+        except json.JSONDecodeError:
+            time.sleep(delay)
+    return False
+
+
+def run_session(session, actions, mix, seed, timeout, data_file, corrupt):
+    import streamlit.logger
+    from streamlit import config
+    from streamlit.testing.v1 import AppTest
+
+    # AppTest re-applies the logger.level option on every run, so set both.
+    config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+    rng = random.Random(seed + session)
+    names, weights = zip(*mix.items())
+    at = AppTest.from_file(APP_FILE, default_timeout=timeout).run()
+    samples, submitted, replied, errors = [], [], [], []
+    for i in range(actions):
+        if corrupt.is_set():
+            break
+        action = rng.choices(names, weights)[0]
+        marker = f"lt-{session}-{i}"
+        try:
+            acked, seconds = HANDLERS[action](at, rng, marker)
+            error = at.exception[0].message if at.exception else None
+        except Exception as e:
+            acked, seconds, error = None, None, f"{type(e).__name__}: {e}"
+        samples.append((action, seconds, error is not None))
+        if error is not None:
+            errors.append(f"{action}: {error}")
+            if not data_file_readable(data_file):
+                corrupt.set()
+                break
+            at = AppTest.from_file(APP_FILE, default_timeout=timeout).run()
+        elif acked and action == "submit":
+            submitted.append(acked)
+        elif acked and action == "reply":
+            replied.append(acked)
+    return {"samples": samples, "submitted": submitted, "replied": replied, "errors": errors}
+
+
+# ── Report ───────────────────────────────────────────────────────────────────
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def build_report(results, data, elapsed):
+    counts = defaultdict(int)
+    latencies = defaultdict(list)
+    failures = defaultdict(int)
+    for result in results:
+        for action, seconds, failed in result["samples"]:
+            counts[action] += 1
+            failures[action] += failed
+            if seconds is not None:
+                latencies[action].append(seconds)
+
+    feedback = " ".join(d["feedback"] for d in data)
+    responses = {d["id"]: d.get("response", "") for d in data}
+    submitted = [m for r in results for m in r["submitted"]]
+    replied = [tuple(e) for r in results for e in r["replied"]]
+    total = sum(counts.values())
+    errors = defaultdict(int)
+    for result in results:
+        for error in result["errors"]:
+            errors[error.splitlines()[0][:120]] += 1
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "operations": total,
+        "throughput_ops_s": round(total / elapsed, 2) if elapsed else 0.0,
+        "actions": {
+            action: {
+                "count": counts[action],
+                "errors": failures[action],
+                "p50_ms": round(percentile(latencies[action], 50) * 1000, 1),
+                "p90_ms": round(percentile(latencies[action], 90) * 1000, 1),
+                "p99_ms": round(percentile(latencies[action], 99) * 1000, 1),
+                "max_ms": round(max(latencies[action], default=0.0) * 1000, 1),
+            }
+            for action in sorted(counts)
+        },
+        "acknowledged_submits": len(submitted),
+        "lost_submits": sum(1 for m in submitted if f"[{m}]" not in feedback),
+        "acknowledged_replies": len(replied),
+        "lost_replies": sum(1 for e, m in replied if f"[{m}]" not in responses.get(e, "")),
+        "errors": dict(sorted(errors.items(), key=lambda e: -e[1])),
+    }
+
+def print_report(report):
+    print(f"\n{report['operations']} operations in {report['elapsed_s']}s "
+          f"→ {report['throughput_ops_s']} ops/s\n")
+    print(f"{'action':<10} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for action, s in report["actions"].items():
+        print(f"{action:<10} {s['count']:>6} {s['errors']:>6} {s['p50_ms']:>9} "
+              f"{s['p90_ms']:>9} {s['p99_ms']:>9} {s['max_ms']:>9}")
+    print(f"\nLost submits: {report['lost_submits']} / {report['acknowledged_submits']} acknowledged")
+    print(f"Lost replies: {report['lost_replies']} / {report['acknowledged_replies']} acknowledged")
+    if report.get("data_file_corrupt"):
+        print("\nRUN STOPPED EARLY: the data file became unreadable, so the figures above only cover")
+        print("the run up to that point and every acknowledged write counts as lost.")
+    if report["errors"]:
+        print("\nErrors:")
+        for error, count in report["errors"].items():
+            print(f"  {count:>4} × {error}")
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action '{name}' (choose from {', '.join(ACTIONS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("mix needs at least one action with a positive weight")
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test feedback_app.py with concurrent headless sessions.")
+    parser.add_argument("--sessions", type=int, default=8, help="parallel sessions (one process each)")
+    parser.add_argument("--actions", type=int, default=20, help="actions performed by each session")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"weighted action mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed-entries", type=int, default=200, help="entries in the seeded dataset")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for dataset and action choice")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds allowed per script run")
+    parser.add_argument("--workdir", help="directory for the data files (default: a fresh temp dir)")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="pulse-loadtest-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    data_file = workdir / "feedback_data.json"
+    os.environ["PULSE_DATA_FILE"] = str(data_file)
+    os.environ["PULSE_OUTBOX_FILE"] = str(workdir / "outbox_data.json")
+    os.environ["PULSE_OUTBOX_STATUS_FILE"] = str(workdir / "outbox_status.json")
+    os.environ["PULSE_OUTBOX_WORKERS"] = "0"
+    seed_dataset(data_file, args.seed_entries, random.Random(args.seed))
+    print(f"Seeded {args.seed_entries} entries in {workdir}; "
+          f"running {args.sessions} sessions × {args.actions} actions...")
+
+    with Manager() as manager:
+        corrupt = manager.Event()
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.sessions) as pool:
+            futures = [
+                pool.submit(run_session, s, args.actions, args.mix, args.seed, args.timeout,
+                            str(data_file), corrupt)
+                for s in range(args.sessions)
+            ]
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+        corrupt = corrupt.is_set()
+
+    corrupt = corrupt or not data_file_readable(data_file)
+    if corrupt:
+        data = []
+    else:
+        with open(data_file) as f:
+            data = json.load(f)
+    report = build_report(results, data, elapsed)
+    report["data_file_corrupt"] = corrupt
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Durable reply outbox and background SMTP delivery.
+
+Replies are appended to ``outbox_data.json`` and the caller returns straight
+away. A small pool of daemon threads claims due messages in batches, sends
+each batch over one SMTP connection and records the outcome, retrying
+temporary failures with exponential backoff. Finished messages leave the
+queue; only their delivery status is kept, in ``outbox_status.json``.
+"""
+import json
+import logging
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime
+from email.message import EmailMessage
+
+# ── Config ───────────────────────────────────────────────────────────────────
+OUTBOX_FILE = os.environ.get("PULSE_OUTBOX_FILE", "outbox_data.json")
+STATUS_FILE = os.environ.get("PULSE_OUTBOX_STATUS_FILE", "outbox_status.json")
+SMTP_HOST = os.environ.get("PULSE_SMTP_HOST", "localhost")
+SMTP_PORT = int(os.environ.get("PULSE_SMTP_PORT", "1025"))
+SMTP_FROM = os.environ.get("PULSE_SMTP_FROM", "pulse@localhost")
+WORKERS = int(os.environ.get("PULSE_OUTBOX_WORKERS", "2"))
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 2.0     # seconds; doubles after every failed attempt
+POLL_INTERVAL = 1.0    # seconds an idle worker waits before looking again
+CLAIM_TIMEOUT = 300.0  # seconds before a batch claimed by a stuck worker is sent again
+
+_lock = threading.Lock()
+_log = logging.getLogger(__name__)
+
+
+# ── Storage ──────────────────────────────────────────────────────────────────
+def _read(path, default):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return default
+
+def _write(path, value):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(value, f, indent=2)
+    os.replace(tmp, path)
+
+def _load():
+    return _read(OUTBOX_FILE, [])
+
+def _save(messages):
+    _write(OUTBOX_FILE, messages)
+
+def enqueue(entries, text):
+    """Queue ``text`` as an email reply to every entry that left an address."""
+    now = datetime.now()
+    queued = [
+        {
+            "id": f"{now.strftime('%Y%m%d%H%M%S%f')}-{entry['id']}",
+            "entry_id": entry["id"],
+            "to": entry["email"],
+            "subject": f"Re: your {entry.get('category', 'Pulse')} feedback",
+            "body": f"Hi {entry.get('name', 'there')},\n\n{text}\n\n> {entry.get('feedback', '')}\n",
+            "status": "queued",
+            "attempts": 0,
+            "next_attempt": time.time(),
+            "last_error": "",
+            "created": now.isoformat(),
+            "sent_at": "",
+        }
+        for entry in entries if entry.get("email")
+    ]
+    if queued:
+        with _lock:
+            messages = _load()
+            messages.extend(queued)
+            _save(messages)
+    return len(queued)
+
+def delivery_status():
+    """Latest delivery status per feedback entry id."""
+    with _lock:
+        statuses = _read(STATUS_FILE, {})
+        messages = _load()
+    statuses.update({m["entry_id"]: m for m in messages})
+    return statuses
+
+def clear():
+    """Drop every queued message and stored status."""
+    with _lock:
+        for path in (OUTBOX_FILE, STATUS_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# ── Delivery ─────────────────────────────────────────────────────────────────
+def _claim(limit):
+    now = time.time()
+    with _lock:
+        messages = _load()
+        batch = []
+        for m in messages:
+            if len(batch) == limit:
+                break
+            due = m["status"] in ("queued", "retrying") and m["next_attempt"] <= now
+            expired = m["status"] == "sending" and m.get("claimed_until", 0) <= now
+            if due or expired:
+                m["status"] = "sending"
+                m["claimed_until"] = now + CLAIM_TIMEOUT
+                batch.append(m)
+        if batch:
+            _save(messages)
+    return batch
+
+def _finish(results):
+    """Record send results; ``results`` maps message id to (error, permanent)."""
+    with _lock:
+        messages = _load()
+        statuses = _read(STATUS_FILE, {})
+        pending = []
+        for m in messages:
+            if m["id"] not in results:
+                pending.append(m)
+                continue
+            error, permanent = results[m["id"]]
+            m["attempts"] += 1
+            m["last_error"] = error or ""
+            if error is None:
+                m["status"] = "sent"
+                m["sent_at"] = datetime.now().isoformat()
+            elif permanent or m["attempts"] >= MAX_ATTEMPTS:
+                m["status"] = "failed"
+            else:
+                m["status"] = "retrying"
+                m["next_attempt"] = time.time() + BACKOFF_BASE * 2 ** (m["attempts"] - 1)
+                pending.append(m)
+                continue
+            statuses[m["entry_id"]] = {
+                k: m[k] for k in ("entry_id", "status", "attempts", "last_error", "sent_at")
+            }
+        _write(STATUS_FILE, statuses)
+        _save(pending)
+
+def _is_permanent(error):
+    """True for 5xx SMTP replies, which will not succeed on a retry."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+def _build(m):
+    msg = EmailMessage()
+    msg["From"] = SMTP_FROM
+    msg["To"] = m["to"]
+    msg["Subject"] = m["subject"]
+    msg.set_content(m["body"])
+    return msg
+
+def _send_batch(batch):
+    """Send ``batch`` over one connection; every message gets a result.
+
+    A message that cannot be built or sent (e.g. an unparseable address) fails
+    on its own. If the connection drops, results already recorded are kept and
+    only the unsent rest of the batch is marked for retry.
+    """
+    results = {}
+    try:
+        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=10) as smtp:
+            for m in batch:
+                try:
+                    smtp.send_message(_build(m))
+                    results[m["id"]] = (None, False)
+                except (smtplib.SMTPServerDisconnected, OSError):
+                    raise
+                except smtplib.SMTPException as e:
+                    results[m["id"]] = (str(e), _is_permanent(e))
+                except Exception as e:
+                    results[m["id"]] = (f"{type(e).__name__}: {e}", True)
+    except Exception as e:
+        for m in batch:
+            results.setdefault(m["id"], (str(e) or type(e).__name__, _is_permanent(e)))
+    return results
+
+def recover():
+    """Requeue messages left mid-send by a previous process."""
+    with _lock:
+        messages = _load()
+        stuck = [m for m in messages if m["status"] == "sending"]
+        for m in stuck:
+            m["status"] = "queued"
+        if stuck:
+            _save(messages)
+
+
+class DeliveryWorkers:
+    def __init__(self, workers=WORKERS, batch_size=BATCH_SIZE):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self):
+        recover()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"outbox-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+        return self
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        for t in self.threads:
+            t.join(timeout)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                batch = _claim(self.batch_size)
+                if batch:
+                    _finish(_send_batch(batch))
+                    continue
+            except Exception:
+                _log.exception("Outbox delivery failed; retrying in %gs", POLL_INTERVAL)
+            self.stop_event.wait(POLL_INTERVAL)
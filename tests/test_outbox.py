@@ -0,0 +1,160 @@
+import socket
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+
+import outbox
+
+
+class StandIn:
+    """Local SMTP server: rejects bad@ with 550, defers busy@ with 451."""
+
+    def __init__(self):
+        self.received = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bad@"):
+            return "550 No such user"
+        if address.startswith("busy@"):
+            return "451 Try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(tmp_path, monkeypatch):
+    handler = StandIn()
+    controller = Controller(handler, hostname="localhost", port=_free_port())
+    controller.start()
+    monkeypatch.setattr(outbox, "OUTBOX_FILE", str(tmp_path / "outbox_data.json"))
+    monkeypatch.setattr(outbox, "STATUS_FILE", str(tmp_path / "outbox_status.json"))
+    monkeypatch.setattr(outbox, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(outbox, "BACKOFF_BASE", 10.0)
+    yield handler
+    controller.stop()
+
+
+def _queue(*addresses):
+    outbox.enqueue([{"id": a, "email": a, "name": "Sam", "feedback": "f"} for a in addresses], "Thanks!")
+
+def _deliver():
+    batch = outbox._claim(outbox.BATCH_SIZE)
+    outbox._finish(outbox._send_batch(batch))
+    return batch
+
+
+def test_sent_message_leaves_queue(smtp):
+    _queue("ok@example.com")
+    _deliver()
+    status = outbox.delivery_status()["ok@example.com"]
+    assert status["status"] == "sent"
+    assert status["attempts"] == 1
+    assert smtp.received == ["ok@example.com"]
+    assert outbox._load() == []
+
+
+def test_temporary_rejection_is_retried_with_backoff(smtp):
+    _queue("busy@example.com")
+    before = time.time()
+    _deliver()
+    [m] = outbox._load()
+    assert m["status"] == "retrying"
+    assert m["attempts"] == 1
+    assert m["next_attempt"] >= before + outbox.BACKOFF_BASE
+    assert outbox._claim(10) == []  # not due yet
+
+    m["next_attempt"] = 0
+    outbox._save([m])
+    before = time.time()
+    _deliver()
+    [m] = outbox._load()
+    assert m["attempts"] == 2
+    assert m["next_attempt"] >= before + 2 * outbox.BACKOFF_BASE
+
+
+def test_temporary_rejection_fails_after_max_attempts(smtp, monkeypatch):
+    monkeypatch.setattr(outbox, "BACKOFF_BASE", 0.0)
+    _queue("busy@example.com")
+    for _ in range(outbox.MAX_ATTEMPTS):
+        _deliver()
+    status = outbox.delivery_status()["busy@example.com"]
+    assert status["status"] == "failed"
+    assert status["attempts"] == outbox.MAX_ATTEMPTS
+    assert outbox._load() == []
+
+
+def test_permanent_rejection_fails_at_once(smtp):
+    _queue("bad@example.com")
+    _deliver()
+    status = outbox.delivery_status()["bad@example.com"]
+    assert status["status"] == "failed"
+    assert status["attempts"] == 1
+    assert "550" in status["last_error"]
+    assert outbox._load() == []
+
+
+def test_invalid_address_does_not_block_or_resend_batch(smtp):
+    _queue("ok@example.com", "<", '"')
+    _deliver()
+    statuses = outbox.delivery_status()
+    assert statuses["ok@example.com"]["status"] == "sent"
+    assert statuses["<"]["status"] == "failed"
+    assert statuses['"']["status"] == "failed"
+    assert outbox._load() == []
+    assert smtp.received == ["ok@example.com"]
+
+
+def test_connection_error_is_retried(smtp, monkeypatch):
+    monkeypatch.setattr(outbox, "SMTP_PORT", _free_port())
+    _queue("ok@example.com")
+    _deliver()
+    [m] = outbox._load()
+    assert m["status"] == "retrying"
+    assert m["last_error"]
+
+
+def test_expired_claim_is_sent_again(smtp):
+    _queue("ok@example.com")
+    assert len(outbox._claim(10)) == 1
+    assert outbox._claim(10) == []  # still held by the first worker
+    [m] = outbox._load()
+    m["claimed_until"] = time.time() - 1  # that worker died CLAIM_TIMEOUT ago
+    outbox._save([m])
+    _deliver()
+    assert outbox.delivery_status()["ok@example.com"]["status"] == "sent"
+
+
+def test_clear_drops_queue_and_statuses(smtp):
+    _queue("ok@example.com")
+    _deliver()
+    _queue("busy@example.com")
+    outbox.clear()
+    assert outbox.delivery_status() == {}
+
+
+def test_workers_deliver_in_background(smtp, monkeypatch):
+    monkeypatch.setattr(outbox, "POLL_INTERVAL", 0.05)
+    workers = outbox.DeliveryWorkers(workers=2).start()
+    try:
+        _queue("ok@example.com", "bad@example.com", "<")
+        deadline = time.time() + 5
+        while outbox._load() and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        workers.stop(timeout=5)
+    statuses = outbox.delivery_status()
+    assert {k: v["status"] for k, v in statuses.items()} == {
+        "ok@example.com": "sent", "bad@example.com": "failed", "<": "failed",
+    }
+    assert smtp.received == ["ok@example.com"]